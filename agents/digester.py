@@ -1,8 +1,14 @@
 """
 Агент для формирования дайджеста
 """
+import asyncio
+import functools
+import itertools
 import logging
+import operator
+import os
 import re
+from collections import Counter, defaultdict
 from datetime import datetime, timedelta
 from crewai import Agent, Task
 from concurrent.futures import ThreadPoolExecutor, as_completed
@@ -11,8 +17,141 @@ from database.db_manager import DatabaseManager
 from llm.gemma_model import GemmaLLM
 from langchain.tools import Tool
 from datetime import datetime, time, timedelta
+try:
+    # google-re2 гарантирует линейное время поиска markdown-ссылок на
+    # худших входах (много несбалансированных '['). Это защита от
+    # патологического текста, а не ускорение: на обычных постах re2
+    # медленнее стандартного re из-за перекодирования в UTF-8
+    import re2 as _scan_re
+except ImportError:
+    _scan_re = re
 logger = logging.getLogger(__name__)
 
+# В re2 \s - только ASCII-пробелы, поэтому юникодные пробелы (например,
+# неразрывный пробел из постов Telegram) перечисляем в классах явно
+_UNICODE_SPACES = '\x0b\x1c-\x1f\x85\xa0\u1680\u2000-\u200a\u2028\u2029\u202f\u205f\u3000'
+
+# Обычный URL в тексте сообщения. Шаблон не допускает перебора с возвратом,
+# поэтому компилируется стандартным re: он здесь быстрее re2
+_URL_RE = re.compile(r'https?://[^\s\)\]\>' + _UNICODE_SPACES + r']+')
+
+# Markdown-ссылка [текст](url). Заголовок ограничен классом символов без ']'
+# и по длине, чтобы на несбалансированных скобках в тексте не было
+# лавинообразного перебора с возвратом. Длину URL не ограничиваем: для re2
+# такой повтор раздувает автомат и поиск откатывается на медленный NFA
+_MD_LINK_RE = _scan_re.compile(
+    r'\[([^\]\n]{0,200})\]\((https?://[^\s\)' + _UNICODE_SPACES + r']+)\)'
+)
+
+# Шаблоны для аннотаций и постобработки (стандартный re: re2 не
+# поддерживает lookbehind)
+_ANNOTATION_URL_RE = re.compile(r'https?://\S+')
+_WHITESPACE_RE = re.compile(r'\s+')
+_SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?])\s+')
+_ESCAPED_NUMBER_DOT_RE = re.compile(r'(\d+)\\\.\s*')
+
+# Переводы строк и табуляции в заголовке заменяются пробелами за один проход
+_TITLE_TRANS = str.maketrans({'\n': ' ', '\r': ' ', '\t': ' '})
+
+# Порядок секций в дайджесте: категории по значимости, "другое" в конце
+_SECTION_ORDER = (*CATEGORIES, "другое")
+
+# Поля сообщения, нужные для группировки по категориям
+_MESSAGE_FIELDS = operator.attrgetter("category", "text")
+
+# Общий пул потоков для генерации секций. Подробные секции почти всё время
+# ждут ответа LLM (GIL в это время свободен), поэтому места хватает на все
+# категории сразу, плюс по потоку на ядро для кратких секций (работа на CPU).
+# Потоки создаются по мере надобности и переиспользуются между дайджестами
+_SECTION_EXECUTOR = ThreadPoolExecutor(
+    max_workers=len(_SECTION_ORDER) + (os.cpu_count() or 2),
+    thread_name_prefix="digest-section"
+)
+
+# Иконки и описания категорий для оформления секций дайджеста
+_CATEGORY_ICONS = {
+    'законодательные инициативы': '📝',
+    'новая судебная практика': '⚖️',
+    'новые законы': '📜',
+    'поправки к законам': '✏️',
+    'другое': '📌'
+}
+
+_CATEGORY_DESCRIPTIONS = {
+    'законодательные инициативы': "Предложения о создании новых законов, находящиеся на стадии обсуждения",
+    'новая судебная практика': "Решения и разъяснения судов, создающие прецеденты",
+    'новые законы': "Недавно принятые и вступившие в силу законодательные акты",
+    'поправки к законам': "Изменения в существующих законах",
+    'другое': "Другие правовые новости и информация"
+}
+
+# Неизменная часть промпта подробной секции идет в начале запроса: LM Studio
+# переиспользует KV-кэш для общего префикса, и запросы по разным категориям
+# не пересчитывают инструкции заново
+_DETAILED_SECTION_RULES = (
+    "Обзор должен:\n"
+    "1. Объединить связанные сообщения\n"
+    "2. Упомянуть источники (каналы)\n"
+    "3. Сохранить важные детали\n"
+    "4. Использовать **полужирное выделение** для ключевых терминов\n"
+    "5. Быть 2-3 абзаца длиной\n"
+)
+
+@functools.lru_cache(maxsize=64)
+def _format_day(day):
+    return day.strftime("%d.%m.%Y")
+
+def _format_date(value):
+    """
+    Форматирует дату как ДД.ММ.ГГГГ. Дайджест охватывает несколько дней,
+    поэтому strftime выполняется один раз на календарный день
+    """
+    if isinstance(value, datetime):
+        value = value.date()
+    return _format_day(value)
+
+@functools.lru_cache(maxsize=32)
+def _brief_section_header(category):
+    """
+    Заголовок секции краткого дайджеста: иконка, название и описание категории
+    """
+    header = f"## {_CATEGORY_ICONS.get(category, '•')} {category.upper()}\n\n"
+    description = _CATEGORY_DESCRIPTIONS.get(category, "")
+    return f"{header}{description}:\n\n" if description else header
+
+@functools.lru_cache(maxsize=32)
+def _detailed_section_header(category):
+    """
+    Заголовок секции подробного дайджеста
+    """
+    title = "ДРУГИЕ НОВОСТИ" if category == "другое" else category.upper()
+    return f"## {_CATEGORY_ICONS.get(category, '•')} {title}\n\n"
+
+def _run_coroutine_sync(coro):
+    """
+    Выполняет корутину из синхронного кода и возвращает ее результат
+
+    create_digest вызывается и из обычных потоков (планировщик, CLI), и
+    прямо из обработчиков бота, где цикл событий уже запущен. Во втором
+    случае asyncio.run в этом потоке невозможен, поэтому корутина
+    выполняется в отдельном потоке со своим циклом событий
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="digest-collect") as executor:
+        return executor.submit(asyncio.run, coro).result()
+
+@functools.lru_cache(maxsize=None)
+def _data_collector_cls():
+    """
+    Класс сборщика данных из Telegram. Импортируется при первом обращении:
+    модуль тянет за собой Telethon, а нужен только когда в БД нет сообщений
+    """
+    from agents.data_collector import DataCollectorAgent
+    return DataCollectorAgent
+
 class DigesterAgent:
     """Агент для формирования дайджеста"""
     
@@ -42,123 +181,124 @@ class DigesterAgent:
             verbose=True,
             tools=[create_digest_tool]
         )
-    def _extract_title_for_url(self, text, url):
+    @staticmethod
+    @functools.lru_cache(maxsize=256)
+    def _dumainfo_title(text):
+        """
+        Первая содержательная строка сообщения из канала думы
+        
+        Не зависит от URL, поэтому для сообщения с несколькими ссылками
+        строки просматриваются один раз, а не для каждой ссылки
+        """
+        for line in text.split('\n'):
+            line = line.strip()
+            # Пропускаем пустые строки и стандартные заголовки
+            if len(line) < 10 or "Государственная Дума" in line:
+                continue
+            
+            # Берем первую содержательную строку как заголовок
+            if len(line) > 15 and "http" not in line and "@" not in line:
+                return line
+        return None
+
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def _extract_title_for_url(text, url):
          
         """
         Улучшенное извлечение заголовка для URL из @dumainfo
         """
         # Проверка на сообщение из канала думы
         if "@dumainfo" in url or "dumainfo" in text:
-            # Разделим по строкам и найдем подходящий заголовок
-            lines = text.split('\n')
-            for i, line in enumerate(lines):
-                # Пропускаем пустые строки и стандартные заголовки
-                if len(line.strip()) < 10 or "Государственная Дума" in line:
-                    continue
-                
-                # Берем первую содержательную строку как заголовок
-                if len(line.strip()) > 15 and "http" not in line and "@" not in line:
-                    return line.strip()
+            title = DigesterAgent._dumainfo_title(text)
+            if title:
+                return title
         # Разделим текст на части до и после URL
-        parts = text.split(url)
+        url_start = text.find(url)
         
-        if len(parts) < 2:
+        if url_start == -1:
             return url[:50] + "..." if len(url) > 50 else url
         
-        before_url = parts[0]
-        after_url = parts[1]
+        # Текст после ссылки берем до ее следующего вхождения, как при split
+        url_end = url_start + len(url)
+        next_start = text.find(url, url_end)
+        before_url = text[:url_start]
+        after_url = text[url_end:next_start] if next_start != -1 else text[url_end:]
         
-        # Ищем заголовок перед URL
-        before_paragraphs = before_url.split('\n\n')
-        last_paragraph = before_paragraphs[-1] if before_paragraphs else ""
+        # Ищем заголовок перед URL (последний абзац перед ссылкой)
+        last_paragraph = before_url.rpartition('\n\n')[2]
         
         # Проверяем на стандартные шаблонные заголовки
         if "Государственная Дума" in last_paragraph or "VK" in last_paragraph or len(last_paragraph.strip()) < 20:
             # Ищем более содержательный текст в первых нескольких строках
-            lines = text.split('\n')
+            lines = text.split('\n', 5)
             for line in lines[1:5]:  # Проверяем первые 5 строк
                 line = line.strip()
                 if len(line) > 30 and "http" not in line and "Telegram" not in line:
                     return line[:100] + "..." if len(line) > 100 else line
         
-        # Далее стандартная логика
-        sentences = last_paragraph.split('.')
-        candidate_title = sentences[-1].strip() if sentences else last_paragraph.strip()
+        # Далее стандартная логика: последнее предложение перед ссылкой
+        candidate_title = last_paragraph.rpartition('.')[2].strip()
         
         # Если заголовок слишком короткий, ищем в тексте после URL
         if len(candidate_title) < 15:
-            after_paragraphs = after_url.split('\n\n')
-            first_paragraph = after_paragraphs[0] if after_paragraphs else ""
-            sentences = first_paragraph.split('.')
-            candidate_title = sentences[0].strip() if sentences else first_paragraph.strip()
+            first_paragraph = after_url.partition('\n\n')[0]
+            candidate_title = first_paragraph.partition('.')[0].strip()
         
         # Очищаем и форматируем заголовок
-        candidate_title = candidate_title.replace("\n", " ").strip()
+        candidate_title = candidate_title.translate(_TITLE_TRANS).strip()
         
         # Ограничиваем длину заголовка
         if len(candidate_title) > 80:
             candidate_title = candidate_title[:77] + "..."
         
         return candidate_title
-    def _add_category_icon(self, category):
-        """
-        Добавляет иконку в зависимости от категории
-        
-        Args:
-            category (str): Название категории
-            
-        Returns:
-            str: Иконка для категории
-        """
-        icons = {
-            'законодательные инициативы': '📝',
-            'новая судебная практика': '⚖️',
-            'новые законы': '📜',
-            'поправки к законам': '✏️',
-            'другое': '📌'
-        }
-        return icons.get(category, '•')
 
-    def _clean_text_with_links(self, text):
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def _clean_text_with_links(text):
         """
         Очищает текст от дублирующихся ссылок и нормализует форматирование
         """
-        # Находим все URL в тексте
-        url_pattern = r'https?://[^\s\)\]\>]+'
-        urls = re.findall(url_pattern, text)
-        
-        # Удаляем дубликаты URL, сохраняя первое вхождение каждого URL
-        for url in set(urls):
-            if urls.count(url) > 1:
-                # Находим все позиции этого URL
-                positions = [m.start() for m in re.finditer(re.escape(url), text)]
-                
-                # Сохраняем только первое вхождение
-                for pos in positions[1:]:
-                    end_pos = pos + len(url)
-                    # Проверяем, не является ли это частью markdown ссылки
-                    if pos > 0 and text[pos-1:pos] == '(' and end_pos < len(text) and text[end_pos:end_pos+1] == ')':
-                        # Находим открывающую скобку перед URL
-                        bracket_pos = text.rfind('[', 0, pos)
-                        if bracket_pos != -1:
-                            # Это часть markdown ссылки, не удаляем
-                            continue
-                    
-                    # Удаляем URL
-                    text = text[:pos] + text[end_pos:]
-                    # Корректируем позиции остальных вхождений
-                    positions = [p - len(url) if p > pos else p for p in positions]
-        
-        # Заменяем обычные URL на markdown ссылки, если они не являются частью markdown
-        for url in set(urls):
-            # Проверяем, уже является ли URL частью markdown ссылки
-            if not re.search(r'\[.*?\]\(' + re.escape(url) + r'\)', text):
-                # Здесь мы НЕ будем добавлять дублирующий текст
-                # Оставляем просто URL как есть или делаем простую ссылку
-                # НЕ делаем: new_link = f"[{url}]({url})"
-                continue  # Просто пропускаем, не меняем обычные URL
-        
-        return text
+        # Дубликат возможен только при двух и более ссылках. Обычно в
+        # сообщении одна ссылка или ни одной, и тогда текст не сканируется
+        if text.count('http') < 2:
+            return text
+        
+        # Удаляем дубликаты URL за один проход, сохраняя первое вхождение
+        # каждого URL. Текст собирается из кусков между удаляемыми ссылками
+        parts = []
+        last_end = 0
+        seen = set()
+        # Позиция первой '[' в тексте: открывающая скобка перед URL есть
+        # тогда и только тогда, когда первая из них стоит раньше URL
+        first_bracket = text.find('[')
+        
+        for match in _URL_RE.finditer(text):
+            url = match.group(0)
+            if url not in seen:
+                seen.add(url)
+                continue
+            
+            start, end = match.span()
+            # Проверяем, не является ли это частью markdown ссылки
+            if start > 0 and text[start-1] == '(' and text[end:end+1] == ')':
+                # Находим открывающую скобку перед URL
+                if first_bracket != -1 and first_bracket < start:
+                    # Это часть markdown ссылки, не удаляем
+                    continue
+            
+            # Удаляем URL
+            parts.append(text[last_end:start])
+            last_end = end
+        
+        if not parts:
+            return text
+        
+        parts.append(text[last_end:])
+        
+        # Обычные URL в markdown-ссылки НЕ оборачиваем (это давало дублирующий текст)
+        return ''.join(parts)
     def _extract_links_and_headlines(self, text):
         """
         Улучшенное извлечение ссылок и заголовков из текста сообщения
@@ -172,8 +312,7 @@ class DigesterAgent:
         results = []
         
         # Шаблон для поиска ссылок в markdown формате [текст](ссылка)
-        markdown_pattern = r'\[(.*?)\]\((https?://[^\s\)]+)\)'
-        markdown_links = re.findall(markdown_pattern, text)
+        markdown_links = _MD_LINK_RE.findall(text)
         
         for title, url in markdown_links:
             # Удостоверимся, что заголовок не пустой и содержательный
@@ -184,12 +323,9 @@ class DigesterAgent:
                     "is_markdown": True
                 })
         
-        # Шаблон для поиска обычных URL
-        url_pattern = r'https?://[^\s\)\]\>]+'
-        
         # Находим URL, которые не были найдены в markdown формате
-        all_urls = re.findall(url_pattern, text)
-        markdown_urls = [link[1] for link in markdown_links]
+        all_urls = _URL_RE.findall(text)
+        markdown_urls = {url for _, url in markdown_links}
         
         for url in all_urls:
             if url not in markdown_urls and url.strip():
@@ -224,6 +360,7 @@ class DigesterAgent:
                     links = self._extract_links_and_headlines(msg.text)
                     
                     if links:
+                        annotation = self._generate_short_annotation(msg.text)
                         # Если нашли ссылки, добавляем каждую из них
                         for link in links:
                             all_items.append({
@@ -232,20 +369,29 @@ class DigesterAgent:
                                 "channel": msg.channel,
                                 "date": msg.date,
                                 "message_id": msg.id,
+                                "annotation": annotation,
                                 "has_url": True
                             })
                     else:
                         # Если ссылок нет, добавляем само сообщение
                         # Используем первую строку или первые 100 символов как заголовок
-                        first_line = msg.text.split('\n')[0]
+                        first_line, _, rest = msg.text.partition('\n')
                         title = first_line[:100] + "..." if len(first_line) > 100 else first_line
                         
+                        # Если заголовок уже содержит весь текст сообщения,
+                        # аннотация лишь повторила бы его
+                        if len(first_line) <= 100 and not rest.strip():
+                            annotation = ""
+                        else:
+                            annotation = self._generate_short_annotation(msg.text)
+                        
                         all_items.append({
                             "title": title,
                             "url": f"https://t.me/{BOT_USERNAME}?start=msg_{msg.id}",
                             "channel": msg.channel,
                             "date": msg.date,
                             "message_id": msg.id,
+                            "annotation": annotation,
                             "has_url": False  # Отмечаем, что это не настоящая ссылка
                         })
                 else:
@@ -259,62 +405,50 @@ class DigesterAgent:
             logger.warning(f"После фильтрации не осталось сообщений для категории '{category}'")
             return f"За данный период новостей по категории '{category}' не удалось обработать."
         
-        # Сортируем сообщения по дате (сначала самые новые)
-        all_items.sort(key=lambda x: x["date"], reverse=True)
+        # Отдельная сортировка не нужна: сообщения приходят из БД уже
+        # отсортированными по дате (сначала новые), а ссылки одного
+        # сообщения добавляются подряд с его датой
         
         # Формируем текст секции
-        category_icon = self._add_category_icon(category)
-        section_text = f"## {category_icon} {category.upper()}\n\n"
-        
-        # Добавляем краткое описание категории
-        category_descriptions = {
-            'законодательные инициативы': "Предложения о создании новых законов, находящиеся на стадии обсуждения",
-            'новая судебная практика': "Решения и разъяснения судов, создающие прецеденты",
-            'новые законы': "Недавно принятые и вступившие в силу законодательные акты",
-            'поправки к законам': "Изменения в существующих законах",
-            'другое': "Другие правовые новости и информация"
-        }
-        
-        description = category_descriptions.get(category, "")
-        if description:
-            section_text += f"{description}:\n\n"
-        
+        section_parts = [_brief_section_header(category)]
+
         # Добавляем все сообщения, включая те, где нет ссылок
         for idx, item in enumerate(all_items):
-            formatted_date = item["date"].strftime("%d.%m.%Y")
+            formatted_date = _format_date(item["date"])
             channel_name = item["channel"]
-            
-            # Создаем краткую аннотацию сообщения
-            message = self.db_manager.get_message_by_id(item["message_id"])
-            annotation = self._generate_short_annotation(message.text)
+            annotation = item["annotation"]
 
             if item["has_url"]:
                 # Если есть настоящая ссылка, используем HTML-формат
-                section_text += f"<b>{idx+1}.</b> <a href='{item['url']}'>{item['title']}</a> - {channel_name}, {formatted_date}\n<i>{annotation}</i>\n\n"
+                section_parts.append(f"<b>{idx+1}.</b> <a href='{item['url']}'>{item['title']}</a> - {channel_name}, {formatted_date}\n<i>{annotation}</i>\n\n")
             else:
                 # Если нет ссылки, просто выводим текст с HTML-форматированием
-                section_text += f"<b>{idx+1}.</b> <b>{item['title']}</b> - {channel_name}, {formatted_date}\n<i>{annotation}</i>\n\n"
+                section_parts.append(f"<b>{idx+1}.</b> <b>{item['title']}</b> - {channel_name}, {formatted_date}\n")
+                section_parts.append(f"<i>{annotation}</i>\n\n" if annotation else "\n")
         
         # Добавляем ссылку на полный обзор
-        section_text += f"\n[Открыть полный обзор по категории '{category}'](/category/{category})\n"
+        section_parts.append(f"\n[Открыть полный обзор по категории '{category}'](/category/{category})\n")
     
         # Удаляем лишние экранирования точек после цифр
-        section_text = re.sub(r'(\d+)\\\.\s*', r'\1. ', section_text)
+        section_text = _ESCAPED_NUMBER_DOT_RE.sub(r'\1. ', "".join(section_parts))
         return section_text
 
-    def _generate_short_annotation(self, text, max_length=150):
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def _generate_short_annotation(text, max_length=150):
         """
         Генерация краткой аннотации сообщения, избегая дублирования заголовка
         """
         # Удаляем URL и лишние пробелы
-        text = re.sub(r'https?://\S+', '', text)
-        text = re.sub(r'\s+', ' ', text).strip()
+        text = _ANNOTATION_URL_RE.sub('', text)
+        text = _WHITESPACE_RE.sub(' ', text).strip()
         
         # Разбиваем на абзацы
         paragraphs = text.split('\n\n')
         
-        # Ищем содержательный абзац, отличный от заголовка
-        first_paragraph = paragraphs[0] if paragraphs else ""
+        # Ищем содержательный абзац, отличный от заголовка (split всегда
+        # возвращает хотя бы один элемент)
+        first_paragraph = paragraphs[0]
         content_paragraph = None
         
         # Ищем первый неявляющийся заголовком абзац 
@@ -328,16 +462,16 @@ class DigesterAgent:
             content_paragraph = clean_paragraph
             break
         
-        # Если не нашли подходящий абзац, используем первый
+        # Если не нашли подходящий абзац, используем второй (если он не
+        # слишком короткий) или первый
         if not content_paragraph:
-            if len(paragraphs) > 1 and len(paragraphs[1].strip()) > 20:
-                content_paragraph = paragraphs[1].strip()
-            else:
-                content_paragraph = first_paragraph
+            second_paragraph = paragraphs[1].strip() if len(paragraphs) > 1 else ""
+            content_paragraph = second_paragraph if len(second_paragraph) > 20 else first_paragraph
         
-        # Берем только первое предложение для аннотации
-        sentences = re.split(r'(?<=[.!?])\s+', content_paragraph)
-        annotation = sentences[0] if sentences else content_paragraph
+        # Берем только первое предложение для аннотации: поиск останавливается
+        # на первой границе предложения, остаток абзаца не разбивается
+        boundary = _SENTENCE_SPLIT_RE.search(content_paragraph)
+        annotation = content_paragraph[:boundary.start()] if boundary else content_paragraph
         
         # Если предложение слишком длинное, обрезаем
         if len(annotation) > max_length:
@@ -369,14 +503,12 @@ class DigesterAgent:
             logger.warning(f"Список сообщений для категории '{category}' пуст")
             return f"За данный период новостей по категории '{category}' не обнаружено."
         
-        # Логгируем типы первых элементов для отладки
-        logger.info(f"Типы первых 3 элементов в списке сообщений для категории '{category}':")
-        for i, msg in enumerate(messages[:3]):
-            logger.info(f"  Элемент {i}: тип={type(msg)}, атрибуты={dir(msg) if hasattr(msg, '__dict__') else 'Нет атрибутов'}")
-        
-        # Добавляем иконку к названию категории
-        category_icon = self._add_category_icon(category)
-        category_display = f"{category_icon} {category}"
+        # Логгируем типы первых элементов для отладки (dir() дорогой, поэтому
+        # только при включенном уровне DEBUG)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Типы первых 3 элементов в списке сообщений для категории '{category}':")
+            for i, msg in enumerate(messages[:3]):
+                logger.debug(f"  Элемент {i}: тип={type(msg)}, атрибуты={dir(msg) if hasattr(msg, '__dict__') else 'Нет атрибутов'}")
         
         # Ограничиваем количество и размер сообщений для запроса
         MAX_MESSAGES = 5  # Ограничиваем кол-во сообщений
@@ -384,20 +516,20 @@ class DigesterAgent:
         
         # Очищаем и нормализуем тексты сообщений
         cleaned_messages = []
-        for i, msg in enumerate(messages[:MAX_MESSAGES]):
+        for i, msg in enumerate(itertools.islice(messages, MAX_MESSAGES)):
             try:
                 # Проверяем, что msg - это объект сообщения, а не строка
                 if hasattr(msg, 'text'):
                     # Сокращаем длинные сообщения
                     message_text = msg.text
-                    logger.debug(f"Сообщение {i} для категории '{category}': длина текста = {len(message_text)}")
+                    logger.debug("Сообщение %d для категории '%s': длина текста = %d", i, category, len(message_text))
                     
                     if len(message_text) > MAX_MESSAGE_LENGTH:
                         message_text = message_text[:MAX_MESSAGE_LENGTH] + "... (текст сокращен)"
                         
                     cleaned_text = self._clean_text_with_links(message_text)
                     cleaned_messages.append(
-                        f"Канал: {msg.channel}\nДата: {msg.date.strftime('%d.%m.%Y')}\n\n{cleaned_text}"
+                        f"Канал: {msg.channel}\nДата: {_format_date(msg.date)}\n\n{cleaned_text}"
                     )
                 else:
                     # Если msg - не объект сообщения, логируем подробную информацию
@@ -427,18 +559,11 @@ class DigesterAgent:
         
         try:
             # Более короткий и точный промпт
-            prompt = f"""
-            Составь краткий обзор новостей категории '{category}' на основе следующих сообщений:
-            
-            {messages_text}
-            
-            Обзор должен:
-            1. Объединить связанные сообщения
-            2. Упомянуть источники (каналы)
-            3. Сохранить важные детали
-            4. Использовать **полужирное выделение** для ключевых терминов
-            5. Быть 2-3 абзаца длиной
-            """
+            prompt = (
+                f"{_DETAILED_SECTION_RULES}\n"
+                f"Составь краткий обзор новостей категории '{category}' на основе следующих сообщений:\n\n"
+                f"{messages_text}\n"
+            )
             
             logger.info(f"Отправка запроса к LLM для категории '{category}'")
             response = self.llm_model.generate(prompt, max_tokens=1500, temperature=0.7)
@@ -454,12 +579,12 @@ class DigesterAgent:
             logger.error(f"Ошибка при генерации подробного обзора по категории '{category}': {str(e)}", exc_info=True)
             
             # Создаем базовый обзор на основе имеющихся сообщений
-            fallback_text = f"Обзор новостей категории '{category}':\n\n"
-            for i, msg in enumerate(messages[:5]):
+            fallback_parts = [f"Обзор новостей категории '{category}':\n\n"]
+            for i, msg in enumerate(itertools.islice(messages, 5)):
                 try:
                     if hasattr(msg, 'channel') and hasattr(msg, 'date') and hasattr(msg, 'text'):
                         channel_name = msg.channel
-                        date_str = msg.date.strftime("%d.%m.%Y")
+                        date_str = _format_date(msg.date)
                         
                         # Извлекаем заголовок сообщения или первую строку
                         lines = msg.text.split('\n')
@@ -467,12 +592,13 @@ class DigesterAgent:
                         if len(title) == 100:
                             title += "..."
                             
-                        fallback_text += f"**{i+1}.** {title} (Источник: {channel_name}, {date_str})\n\n"
+                        fallback_parts.append(f"**{i+1}.** {title} (Источник: {channel_name}, {date_str})\n\n")
                     else:
                         logger.warning(f"Пропуск сообщения {i} при создании резервного текста - нет необходимых атрибутов")
                 except Exception as inner_e:
                     logger.error(f"Ошибка при формировании резервного текста для сообщения {i}: {str(inner_e)}")
             
+            fallback_text = "".join(fallback_parts)
             logger.info(f"Создан резервный текст для категории '{category}', длина: {len(fallback_text)} символов")
             return fallback_text
 
@@ -490,15 +616,15 @@ class DigesterAgent:
         Returns:
             str: Текст вводной части
         """
-        formatted_date = date.strftime("%d.%m.%Y")
+        formatted_date = _format_date(date)
         
         # Формируем строку с периодом
         period_text = formatted_date
         if days_back > 1:
-            start_date = (date - timedelta(days=days_back-1)).strftime("%d.%m.%Y")
+            start_date = _format_date(date - timedelta(days=days_back-1))
             period_text = f"период с {start_date} по {formatted_date}"
         
-        categories_info = "\n".join([f"- {cat}: {count} сообщений" for cat, count in categories_count.items() if count > 0])
+        categories_info = "\n".join(f"- {cat}: {count} сообщений" for cat, count in categories_count.items() if count > 0)
         
         prompt = f"""
         Напиши краткое вступление к {"краткому" if is_brief else "подробному"} дайджесту правовых новостей за {period_text}.
@@ -535,33 +661,38 @@ class DigesterAgent:
         for category in categories_to_process:
             logger.info(f"Категория '{category}': {len(messages_by_category[category])} сообщений")
         
-        with ThreadPoolExecutor(max_workers=min(4, len(categories_to_process))) as executor:
-            future_to_category = {}
-            
-            for category in categories_to_process:
-                logger.info(f"Отправка задачи на обработку категории '{category}'")
-                if digest_type == "brief":
-                    future = executor.submit(
-                        self._generate_brief_section, category, messages_by_category[category]
-                    )
-                else:
-                    future = executor.submit(
-                        self._generate_detailed_section, category, messages_by_category[category]
-                    )
-                future_to_category[future] = category
-            
-            for future in as_completed(future_to_category):
-                category = future_to_category[future]
-                try:
-                    logger.info(f"Получение результата для категории '{category}'")
-                    section_text = future.result()
-                    results[category] = section_text
-                    logger.info(f"Успешно обработана категория '{category}', длина текста: {len(section_text)} символов")
-                except Exception as e:
-                    logger.error(f"Ошибка при обработке категории '{category}': {str(e)}", exc_info=True)
+        # Задачи отправляются в общий пул потоков модуля: потоки не создаются
+        # заново для каждого вызова и каждого экземпляра агента
+        future_to_category = {}
+        
+        for category in categories_to_process:
+            logger.info(f"Отправка задачи на обработку категории '{category}'")
+            if digest_type == "brief":
+                future = _SECTION_EXECUTOR.submit(
+                    self._generate_brief_section, category, messages_by_category[category]
+                )
+            else:
+                future = _SECTION_EXECUTOR.submit(
+                    self._generate_detailed_section, category, messages_by_category[category]
+                )
+            future_to_category[future] = category
+        
+        # Все задачи отправлены до начала ожидания, поэтому категории
+        # выполняются одновременно, а результаты собираются по готовности
+        for future in as_completed(future_to_category):
+            category = future_to_category[future]
+            try:
+                logger.info(f"Получение результата для категории '{category}'")
+                section_text = future.result()
+                results[category] = section_text
+                logger.info(f"Успешно обработана категория '{category}', длина текста: {len(section_text)} символов")
+            except Exception as e:
+                logger.error(f"Ошибка при обработке категории '{category}': {str(e)}", exc_info=True)
         
         logger.info(f"Завершена параллельная обработка категорий. Обработано {len(results)} из {len(categories_to_process)}")
-        return results
+        # Возвращаем секции в порядке переданных категорий, а не в порядке
+        # завершения потоков
+        return {category: results[category] for category in categories_to_process if category in results}
 
     def create_digest(self, date=None, days_back=1, digest_type="both", 
                 update_existing=True, focus_category=None,
@@ -583,6 +714,10 @@ class DigesterAgent:
             dict: Результаты создания дайджеста
         """
         logger.info(f"Запрос на создание дайджеста: date={date}, days_back={days_back}, тип={digest_type}")
+        
+        # Какие версии дайджеста нужно сформировать
+        want_brief = digest_type in ("brief", "both")
+        want_detailed = digest_type in ("detailed", "both")
 
         # Определяем конечную дату
         if date:
@@ -616,7 +751,8 @@ class DigesterAgent:
                 logger.info(f"Используем период из {days_back} дней до текущего момента: "
                         f"с {start_date.strftime('%Y-%m-%d %H:%M')} по {end_date.strftime('%Y-%m-%d %H:%M')}")
         
-        logger.info(f"Создание дайджеста за период с {start_date.strftime('%Y-%m-%d')} по {end_date.strftime('%Y-%m-%d')}, тип: {digest_type}")
+        end_date_str = end_date.strftime("%Y-%m-%d")
+        logger.info(f"Создание дайджеста за период с {start_date.strftime('%Y-%m-%d')} по {end_date_str}, тип: {digest_type}")
         
         # БЛОК 1: ОПРЕДЕЛЕНИЕ СЕГОДНЯШНЕГО ДАЙДЖЕСТА
         # Блок определения существующих дайджестов в create_digest
@@ -689,30 +825,26 @@ class DigesterAgent:
                 messages = all_messages
             else:
                 logger.info("Сообщения за указанный период не найдены, запускаем сбор из Telegram...")
-                from agents.data_collector import DataCollectorAgent
-                import asyncio
+                collector = _data_collector_cls()(self.db_manager)
                 
-                collector = DataCollectorAgent(self.db_manager)
+                # Асинхронный сбор запускается и без цикла событий, и из
+                # обработчиков бота, где цикл уже работает
+                collect_result = _run_coroutine_sync(collector.collect_data(
+                    days_back=days_back,
+                    force_update=True,
+                    start_date=start_date,
+                    end_date=end_date
+                ))
                 
-                # Создаем цикл событий для синхронного вызова асинхронной функции
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
+                logger.info(f"Результат сбора данных: {collect_result}")
                 
-                try:
-                    # Запускаем сбор с явным указанием start_date и end_date
-                    collect_result = loop.run_until_complete(collector.collect_data(
-                        days_back=days_back,
-                        force_update=True,
-                        start_date=start_date,
-                        end_date=end_date
-                    ))
-                    
-                    logger.info(f"Результат сбора данных: {collect_result}")
-                    
-                    # Проверяем снова после сбора
+                # Проверяем снова после сбора. Если сборщик явно сообщил, что
+                # новых сообщений нет, повторный запрос вернет тот же пустой
+                # результат, поэтому его пропускаем
+                if isinstance(collect_result, dict) and collect_result.get("total_new_messages") == 0:
+                    messages = []
+                else:
                     messages = self.db_manager.get_messages_by_date_range(start_date, end_date)
-                finally:
-                    loop.close()
                     
                 if not messages:
                     logger.error("Сообщения за указанный период не найдены даже после сбора из Telegram")
@@ -722,27 +854,32 @@ class DigesterAgent:
                     }
         
         # Группировка по категориям
-        messages_by_category = {}
-        categories_count = {category: 0 for category in CATEGORIES}
-        categories_count["другое"] = 0
-        total_messages = 0
+        messages_by_category = defaultdict(list)
+        # Пропущенные объекты считаем по типам и логируем одной строкой
+        skipped_types = Counter()
         
         for msg in messages:
-            if not hasattr(msg, 'category') or not hasattr(msg, 'text'):
-                logger.warning(f"Пропуск объекта, не являющегося сообщением: {type(msg)}")
+            # Одно обращение читает оба атрибута и заодно проверяет, что это
+            # сообщение: у посторонних объектов его нет
+            try:
+                category, _ = _MESSAGE_FIELDS(msg)
+            except AttributeError:
+                skipped_types[type(msg).__name__] += 1
                 continue
                 
-            category = msg.category if msg.category else "другое"
-            if category not in messages_by_category:
-                messages_by_category[category] = []
+            category = category or "другое"
             messages_by_category[category].append(msg)
-            
-            if category in categories_count:
-                categories_count[category] += 1
-            else:
-                categories_count["другое"] += 1
-            
-            total_messages += 1
+        
+        if skipped_types:
+            logger.warning(f"Пропущено {sum(skipped_types.values())} объектов, не являющихся сообщениями: {dict(skipped_types)}")
+        
+        # Счетчики считаются по готовым группам, а не на каждое сообщение.
+        # Неизвестные категории, как и раньше, учитываются в "другое"
+        categories_count = dict.fromkeys(_SECTION_ORDER, 0)
+        for category, category_messages in messages_by_category.items():
+            counted_as = category if category in categories_count else "другое"
+            categories_count[counted_as] += len(category_messages)
+        total_messages = sum(categories_count.values())
         
         # Если после фильтрации не осталось сообщений
         if total_messages == 0:
@@ -753,157 +890,164 @@ class DigesterAgent:
             }
 
         logger.info(f"Группировка сообщений по категориям завершена. Всего категорий: {len(messages_by_category)}")
-        for category, msgs in messages_by_category.items():
-            logger.info(f"Категория '{category}': {len(msgs)} сообщений")
-            # Проверяем типы первых трех элементов для отладки
-            for i, msg in enumerate(msgs[:3]):
-                logger.info(f"  Сообщение {i} для '{category}': тип={type(msg)}, имеет атрибут 'text'={hasattr(msg, 'text')}")
+        if logger.isEnabledFor(logging.DEBUG):
+            for category, msgs in messages_by_category.items():
+                logger.debug(f"Категория '{category}': {len(msgs)} сообщений")
+                # Проверяем типы первых трех элементов для отладки
+                for i, msg in enumerate(msgs[:3]):
+                    logger.debug(f"  Сообщение {i} для '{category}': тип={type(msg)}, имеет атрибут 'text'={hasattr(msg, 'text')}")
 
         # Формируем секции дайджеста в зависимости от типа
         brief_sections = {}
         detailed_sections = {}
         
-        if digest_type in ["brief", "both"]:
-            # Параллельная обработка категорий для краткого дайджеста
-            categories_to_process = [cat for cat in messages_by_category.keys()]
-            brief_sections = self._process_categories_parallel(
-                categories_to_process, messages_by_category, "brief"
-            )
-        
-        if digest_type in ["detailed", "both"]:
-            # Параллельная обработка категорий для подробного дайджеста
-            categories_to_process = [cat for cat in messages_by_category.keys()]
-            detailed_sections = self._process_categories_parallel(
-                categories_to_process, messages_by_category, "detailed"
-            )
+        # Вводные части зависят только от статистики сообщений, поэтому
+        # запросы к LLM для них выполняются одновременно с генерацией секций,
+        # а не последовательно после нее. Краткие секции (работа на CPU)
+        # тоже считаются в фоне, пока подробные ждут ответа LLM
+        with ThreadPoolExecutor(max_workers=3) as stage_executor:
+            intro_futures = {}
+            if want_brief:
+                intro_futures["brief"] = stage_executor.submit(
+                    self._generate_digest_intro, end_date, total_messages, categories_count,
+                    is_brief=True, days_back=days_back
+                )
+            if want_detailed:
+                intro_futures["detailed"] = stage_executor.submit(
+                    self._generate_digest_intro, end_date, total_messages, categories_count,
+                    is_brief=False, days_back=days_back
+                )
+            
+            # Категории в порядке вывода в дайджесте: секции возвращаются в
+            # том же порядке и собираются в текст без дополнительных проверок
+            categories_to_process = [cat for cat in _SECTION_ORDER if cat in messages_by_category]
+            
+            brief_future = None
+            if want_brief:
+                # Параллельная обработка категорий для краткого дайджеста
+                brief_future = stage_executor.submit(
+                    self._process_categories_parallel,
+                    categories_to_process, messages_by_category, "brief"
+                )
+            
+            if want_detailed:
+                # Параллельная обработка категорий для подробного дайджеста
+                detailed_sections = self._process_categories_parallel(
+                    categories_to_process, messages_by_category, "detailed"
+                )
+            
+            if brief_future is not None:
+                brief_sections = brief_future.result()
 
         results = {
             "status": "success",
-            "date": end_date.strftime("%Y-%m-%d"),
+            "date": end_date_str,
             "total_messages": total_messages,
             "categories": categories_count,
         }
         
+        # Дайджесты, ожидающие сохранения в БД
+        pending_digests = []
+        
         # Формируем краткий дайджест, если запрошено
-        if digest_type in ["brief", "both"]:
+        if want_brief:
             try:
-                # Генерируем вводную часть
-                intro_text = self._generate_digest_intro(
-                    end_date, total_messages, categories_count, 
-                    is_brief=True, days_back=days_back
-                )
+                # Вводная часть уже сгенерирована параллельно с секциями
+                intro_text = intro_futures["brief"].result()
                 
                 # Формируем полный текст краткого дайджеста
-                brief_text = f"{intro_text}\n\n"
-                
-                # Сначала добавляем категории с сообщениями в порядке значимости
-                for category in CATEGORIES:
-                    if category in brief_sections:
-                        brief_text += f"{brief_sections[category]}\n\n"
+                brief_parts = [f"{intro_text}\n\n"]
                 
-                # Добавляем категорию "другое" в конец, если есть сообщения
-                if "другое" in brief_sections:
-                    brief_text += f"{brief_sections['другое']}\n\n"
+                # Секции уже упорядочены по значимости, "другое" - в конце
+                for section_text in brief_sections.values():
+                    brief_parts.append(f"{section_text}\n\n")
                 
                 # Добавляем ссылку на подробный дайджест, если генерируются оба
                 if digest_type == "both":
-                    brief_text += "\n\n[Просмотреть подробный дайджест](/digest/detailed)\n"
+                    brief_parts.append("\n\n[Просмотреть подробный дайджест](/digest/detailed)\n")
+                
+                brief_text = "".join(brief_parts)
                 
                 results["brief_digest_text"] = brief_text
                 
-                today = datetime.now().date() 
-                is_today_digest = end_date.date() == today
+                # Определяем ID существующего дайджеста для обновления
+                brief_digest_id = digest_id if digest_type == "brief" else None
+                if digest_type == "both" and "brief" in digests_by_type:
+                    brief_digest_id = digests_by_type["brief"]["id"]
                 
-                # Сохраняем краткий дайджест в БД с параметрами
-                try:
-                    # Определяем ID существующего дайджеста для обновления
-                    brief_digest_id = digest_id if digest_type == "brief" else None
-                    if digest_type == "both" and "brief" in digests_by_type:
-                        brief_digest_id = digests_by_type["brief"]["id"]
-                    
-                    brief_result = self.db_manager.save_digest_with_parameters(
-                        end_date, 
-                        brief_text, 
-                        brief_sections,
-                        digest_type="brief",
-                        date_range_start=start_date,
-                        date_range_end=end_date,
-                        focus_category=focus_category,
-                        channels_filter=channels,
-                        keywords_filter=keywords,
-                        digest_id=brief_digest_id,
-                        is_today=is_today_digest
-                    )
-                    results["brief_digest_id"] = brief_result["id"]
-                    logger.info(f"Краткий дайджест успешно создан и сохранен (ID: {brief_result['id']})")
-                except Exception as e:
-                    logger.error(f"Ошибка при сохранении краткого дайджеста: {str(e)}")
-                    results["brief_error"] = str(e)
+                # Сохранение откладываем, чтобы записать оба дайджеста разом
+                pending_digests.append(dict(
+                    date=end_date,
+                    text=brief_text,
+                    sections=brief_sections,
+                    digest_type="brief",
+                    date_range_start=start_date,
+                    date_range_end=end_date,
+                    focus_category=focus_category,
+                    channels_filter=channels,
+                    keywords_filter=keywords,
+                    digest_id=brief_digest_id,
+                    is_today=is_today_digest
+                ))
             except Exception as e:
                 logger.error(f"Ошибка при создании краткого дайджеста: {str(e)}")
                 results["brief_error"] = str(e)
         
         # Формируем подробный дайджест, если запрошено
-        if digest_type in ["detailed", "both"]:
+        if want_detailed:
             try:
-                # Генерируем вводную часть
-                intro_text = self._generate_digest_intro(
-                    end_date, total_messages, categories_count, 
-                    is_brief=False, days_back=days_back
-                )
+                # Вводная часть уже сгенерирована параллельно с секциями
+                intro_text = intro_futures["detailed"].result()
                 
                 # Формируем полный текст подробного дайджеста
-                detailed_text = f"{intro_text}\n\n"
-                
-                # Добавляем секции по категориям в порядке значимости
-                for category in CATEGORIES:
-                    if category in detailed_sections:
-                        category_icon = self._add_category_icon(category)
-                        detailed_text += f"## {category_icon} {category.upper()}\n\n{detailed_sections[category]}\n\n"
+                detailed_parts = [f"{intro_text}\n\n"]
                 
-                # Добавляем категорию "другое" в конец, если есть сообщения
-                if "другое" in detailed_sections:
-                    category_icon = self._add_category_icon("другое")
-                    detailed_text += f"## {category_icon} ДРУГИЕ НОВОСТИ\n\n{detailed_sections['другое']}\n\n"
+                # Секции уже упорядочены по значимости, "другое" - в конце
+                for category, section_text in detailed_sections.items():
+                    detailed_parts.append(f"{_detailed_section_header(category)}{section_text}\n\n")
                 
                 # Добавляем ссылку на краткий дайджест, если генерируются оба
                 if digest_type == "both":
-                    detailed_text += "\n\n[Просмотреть краткий дайджест](/digest/brief)\n"
+                    detailed_parts.append("\n\n[Просмотреть краткий дайджест](/digest/brief)\n")
+                
+                detailed_text = "".join(detailed_parts)
                 
                 results["detailed_digest_text"] = detailed_text
                 
-                today = datetime.now().date() 
-                is_today_digest = end_date.date() == today
+                # Определяем ID существующего дайджеста для обновления
+                detailed_digest_id = digest_id if digest_type == "detailed" else None
+                if digest_type == "both" and "detailed" in digests_by_type:
+                    detailed_digest_id = digests_by_type["detailed"]["id"]
                 
-                # Сохраняем подробный дайджест в БД с параметрами
-                try:
-                    # Определяем ID существующего дайджеста для обновления
-                    detailed_digest_id = digest_id if digest_type == "detailed" else None
-                    if digest_type == "both" and "detailed" in digests_by_type:
-                        detailed_digest_id = digests_by_type["detailed"]["id"]
-                    
-                    detailed_result = self.db_manager.save_digest_with_parameters(
-                        end_date, 
-                        detailed_text, 
-                        detailed_sections,
-                        digest_type="detailed",
-                        date_range_start=start_date,
-                        date_range_end=end_date,
-                        focus_category=focus_category,
-                        channels_filter=channels,
-                        keywords_filter=keywords,
-                        digest_id=detailed_digest_id,
-                        is_today=is_today_digest
-                    )
-                    results["detailed_digest_id"] = detailed_result["id"]
-                    logger.info(f"Подробный дайджест успешно создан и сохранен (ID: {detailed_result['id']})")
-                except Exception as e:
-                    logger.error(f"Ошибка при сохранении подробного дайджеста: {str(e)}")
-                    results["detailed_error"] = str(e)
+                pending_digests.append(dict(
+                    date=end_date,
+                    text=detailed_text,
+                    sections=detailed_sections,
+                    digest_type="detailed",
+                    date_range_start=start_date,
+                    date_range_end=end_date,
+                    focus_category=focus_category,
+                    channels_filter=channels,
+                    keywords_filter=keywords,
+                    digest_id=detailed_digest_id,
+                    is_today=is_today_digest
+                ))
             except Exception as e:
                 logger.error(f"Ошибка при создании подробного дайджеста: {str(e)}")
                 results["detailed_error"] = str(e)
         
+        # Сохраняем сформированные дайджесты в БД одной транзакцией
+        if pending_digests:
+            try:
+                saved_digests = self.db_manager.save_digests_with_parameters(pending_digests)
+                for params, saved in zip(pending_digests, saved_digests):
+                    results[f"{params['digest_type']}_digest_id"] = saved["id"]
+                    logger.info(f"Дайджест типа '{params['digest_type']}' успешно создан и сохранен (ID: {saved['id']})")
+            except Exception as e:
+                logger.error(f"Ошибка при сохранении дайджестов: {str(e)}")
+                for params in pending_digests:
+                    results[f"{params['digest_type']}_error"] = str(e)
+        
         return results
     def get_digest_to_update(self, date, digest_type):
         """
@@ -952,6 +1096,65 @@ class DigesterAgent:
             agent=self.agent,
             expected_output="Результаты создания дайджеста с полным текстом"
         )
+    def _update_digest(self, digest):
+        """
+        Пересоздает один дайджест с его сохраненными параметрами
+        
+        Args:
+            digest (dict): Данные дайджеста из БД
+                
+        Returns:
+            dict: Результат обновления дайджеста
+        """
+        # Извлекаем параметры для создания нового дайджеста
+        digest_date = digest["date"]
+        digest_type = digest["digest_type"]
+        focus_category = digest["focus_category"]
+        channels = digest["channels_filter"]
+        keywords = digest["keywords_filter"]
+        
+        # Определяем период для обновления
+        if digest["date_range_start"] and digest["date_range_end"]:
+            start_date = digest["date_range_start"]
+            end_date = digest["date_range_end"]
+            days_back = (end_date - start_date).days + 1
+        else:
+            # Если диапазон не указан, считаем, что это дайджест за один день
+            start_date = end_date = digest_date
+            days_back = 1
+        
+        end_date_str = end_date.strftime('%Y-%m-%d')
+        
+        try:
+            # Обновляем дайджест с теми же параметрами
+            result = self.create_digest(
+                date=end_date,
+                days_back=days_back,
+                digest_type=digest_type,
+                update_existing=True,
+                focus_category=focus_category,
+                channels=channels,
+                keywords=keywords,
+                digest_id=digest["id"]
+            )
+            
+            logger.info(f"Дайджест ID {digest['id']} успешно обновлен")
+            
+            return {
+                "digest_id": digest["id"],
+                "digest_type": digest_type,
+                "date": end_date_str,
+                "status": "success"
+            }
+        except Exception as e:
+            logger.error(f"Ошибка при обновлении дайджеста ID {digest['id']}: {str(e)}")
+            return {
+                "digest_id": digest["id"],
+                "digest_type": digest_type,
+                "date": end_date_str,
+                "status": "error",
+                "error": str(e)
+            }
     def update_digests_for_date(self, date):
         """
         Обновляет все дайджесты, содержащие указанную дату
@@ -962,7 +1165,8 @@ class DigesterAgent:
         Returns:
             dict: Результаты обновления
         """
-        logger.info(f"Обновление дайджестов, содержащих дату {date.strftime('%Y-%m-%d')}")
+        date_str = date.strftime('%Y-%m-%d')
+        logger.info(f"Обновление дайджестов, содержащих дату {date_str}")
         
         # Найти все дайжесты, которые содержат данную дату
         digests = self.db_manager.get_digests_containing_date(date)
@@ -980,8 +1184,8 @@ class DigesterAgent:
                     logger.info(f"Найдено {len(today_digests)} дайджестов за сегодня с флагом is_today=True")
         
         if not digests:
-            logger.info(f"Дайджесты, содержащие дату {date.strftime('%Y-%m-%d')}, не найдены")
-            return {"status": "no_digests", "date": date.strftime('%Y-%m-%d')}
+            logger.info(f"Дайджесты, содержащие дату {date_str}, не найдены")
+            return {"status": "no_digests", "date": date_str}
         
         # Группируем дайджесты по типу и оставляем только самые ранние для каждого типа
         # Это предотвратит обновление дублей
@@ -994,58 +1198,13 @@ class DigesterAgent:
         digests = list(unique_digests.values())
         logger.info(f"Уникальных дайджестов для обновления: {len(digests)}")
         
-        results = {"updated_digests": []}
-        
-        for digest in digests:
-            # Извлекаем параметры для создания нового дайджеста
-            digest_date = digest["date"]
-            digest_type = digest["digest_type"]
-            focus_category = digest["focus_category"]
-            channels = digest["channels_filter"]
-            keywords = digest["keywords_filter"]
-            
-            # Определяем период для обновления
-            if digest["date_range_start"] and digest["date_range_end"]:
-                start_date = digest["date_range_start"]
-                end_date = digest["date_range_end"]
-                days_back = (end_date - start_date).days + 1
-            else:
-                # Если диапазон не указан, считаем, что это дайджест за один день
-                start_date = end_date = digest_date
-                days_back = 1
-            
-            try:
-                # Обновляем дайджест с теми же параметрами
-                result = self.create_digest(
-                    date=end_date,
-                    days_back=days_back,
-                    digest_type=digest_type,
-                    update_existing=True,
-                    focus_category=focus_category,
-                    channels=channels,
-                    keywords=keywords,
-                    digest_id=digest["id"]
-                )
-                
-                results["updated_digests"].append({
-                    "digest_id": digest["id"],
-                    "digest_type": digest_type,
-                    "date": end_date.strftime('%Y-%m-%d'),
-                    "status": "success"
-                })
-                
-                logger.info(f"Дайджест ID {digest['id']} успешно обновлен")
-            except Exception as e:
-                logger.error(f"Ошибка при обновлении дайджеста ID {digest['id']}: {str(e)}")
-                results["updated_digests"].append({
-                    "digest_id": digest["id"],
-                    "digest_type": digest_type,
-                    "date": end_date.strftime('%Y-%m-%d'),
-                    "status": "error",
-                    "error": str(e)
-                })
+        # Дайджесты разных типов обновляются независимо друг от друга,
+        # поэтому пересоздаются параллельно. Ошибки обрабатываются внутри
+        # _update_digest, результаты идут в порядке списка дайджестов
+        with ThreadPoolExecutor(max_workers=min(4, len(digests))) as executor:
+            results = {"updated_digests": list(executor.map(self._update_digest, digests))}
         
-        logger.info(f"Обновлено {len(results['updated_digests'])} дайджестов для даты {date.strftime('%Y-%m-%d')}")
+        logger.info(f"Обновлено {len(results['updated_digests'])} дайджестов для даты {date_str}")
         return results
     def save_digest_with_parameters(self, date, text, sections, digest_type="brief", 
                               date_range_start=None, date_range_end=None, 
@@ -41,6 +41,11 @@ CATEGORIES = [
     'поправки к законам'
 ]
 
+# Максимум одновременных запросов к LLM Studio. По умолчанию хватает на один
+# дайджест целиком: подробные секции всех категорий и "другое" плюс два
+# вступления, чтобы секции не ждали друг друга
+LLM_MAX_CONCURRENT_REQUESTS = int(os.getenv("LLM_MAX_CONCURRENT_REQUESTS", len(CATEGORIES) + 1 + 2))
+
 # Расписание задач
 COLLECT_INTERVAL_MINUTES = 30
 ANALYZE_INTERVAL_MINUTES = 30
@@ -272,9 +272,6 @@ class DatabaseManager:
                 query = query.filter(Message.channel.in_(channels))
             
             if keywords:
-                # Импортируем or_ для корректной работы условий
-                from sqlalchemy import or_
-                
                 # Фильтрация по ключевым словам в тексте
                 keyword_conditions = []
                 for keyword in keywords:
@@ -714,106 +711,103 @@ class DatabaseManager:
         finally:
             session.close()
 
-    @with_retry(max_attempts=5, delay=1.0)
-    def save_digest_with_parameters(self, date, text, sections, digest_type="brief", 
-                            date_range_start=None, date_range_end=None, 
-                            focus_category=None, channels_filter=None, 
-                            keywords_filter=None, digest_id=None,
-                            is_today=False, last_updated=None):
+    def _stage_digest(self, session, date, text, sections, digest_type="brief",
+                      date_range_start=None, date_range_end=None,
+                      focus_category=None, channels_filter=None,
+                      keywords_filter=None, digest_id=None,
+                      is_today=False, last_updated=None):
         """
-        Сохранение дайджеста с расширенными параметрами и улучшенной обработкой ошибок
+        Подготовка дайджеста и его секций в сессии без фиксации транзакции
+        
+        Returns:
+            dict: Данные сохраняемого дайджеста (объект Digest в ключе "digest")
         """
-        session = self.Session()
-        try:
-            # Подготавливаем данные JSON полей
-            channels_json = None
-            keywords_json = None
+        # Подготавливаем данные JSON полей
+        channels_json = None
+        keywords_json = None
+        
+        if channels_filter is not None:
+            try:
+                # Проверяем, не является ли значение уже строкой JSON
+                if isinstance(channels_filter, str):
+                    # Пробуем распарсить и снова сериализовать для проверки
+                    json.loads(channels_filter)
+                    channels_json = channels_filter
+                else:
+                    channels_json = json.dumps(channels_filter)
+            except (TypeError, json.JSONDecodeError):
+                # Если не получается распарсить как JSON, сохраняем как есть
+                channels_json = json.dumps(None)
+        
+        if keywords_filter is not None:
+            try:
+                if isinstance(keywords_filter, str):
+                    json.loads(keywords_filter)
+                    keywords_json = keywords_filter
+                else:
+                    keywords_json = json.dumps(keywords_filter)
+            except (TypeError, json.JSONDecodeError):
+                keywords_json = json.dumps(None)
+        
+        # Устанавливаем время последнего обновления, если не указано
+        if last_updated is None:
+            last_updated = datetime.now()
+        
+        sections_unchanged = False
             
-            if channels_filter is not None:
-                try:
-                    # Проверяем, не является ли значение уже строкой JSON
-                    if isinstance(channels_filter, str):
-                        # Пробуем распарсить и снова сериализовать для проверки
-                        json.loads(channels_filter)
-                        channels_json = channels_filter
-                    else:
-                        channels_json = json.dumps(channels_filter)
-                except (TypeError, json.JSONDecodeError):
-                    # Если не получается распарсить как JSON, сохраняем как есть
-                    channels_json = json.dumps(None)
+        if digest_id:
+            # Поиск существующего дайджеста с обработкой блокировок
+            digest = None
+            retry_count = 0
+            max_retries = 3
             
-            if keywords_filter is not None:
+            while retry_count < max_retries:
                 try:
-                    if isinstance(keywords_filter, str):
-                        json.loads(keywords_filter)
-                        keywords_json = keywords_filter
-                    else:
-                        keywords_json = json.dumps(keywords_filter)
-                except (TypeError, json.JSONDecodeError):
-                    keywords_json = json.dumps(None)
-            
-            # Устанавливаем время последнего обновления, если не указано
-            if last_updated is None:
-                last_updated = datetime.now()
+                    digest = session.query(Digest).filter_by(id=digest_id).with_for_update().first()
+                    break
+                except Exception as e:
+                    retry_count += 1
+                    if retry_count >= max_retries:
+                        raise
+                    logger.warning(f"Не удалось получить блокировку на дайджест ID={digest_id}, попытка {retry_count}/{max_retries}")
+                    time.sleep(1)
+            
+            if digest:
+                # Если текст не изменился (новых сообщений не было), сверяем и
+                # секции: при совпадении они не удаляются и не вставляются заново
+                if digest.text == text:
+                    existing_sections = {
+                        section.category: section.text
+                        for section in session.query(DigestSection).filter_by(digest_id=digest_id)
+                    }
+                    sections_unchanged = existing_sections == dict(sections)
                 
-            if digest_id:
-                # Поиск существующего дайджеста с обработкой блокировок
-                digest = None
-                retry_count = 0
-                max_retries = 3
+                # Обновляем поля дайджеста
+                digest.text = text
+                digest.date = date
+                digest.last_updated = last_updated
                 
-                while retry_count < max_retries:
-                    try:
-                        digest = session.query(Digest).filter_by(id=digest_id).with_for_update().first()
-                        break
-                    except Exception as e:
-                        retry_count += 1
-                        if retry_count >= max_retries:
-                            raise
-                        logger.warning(f"Не удалось получить блокировку на дайджест ID={digest_id}, попытка {retry_count}/{max_retries}")
-                        time.sleep(1)
+                # Обновляем дополнительные параметры, если они предоставлены
+                if date_range_start is not None:
+                    digest.date_range_start = date_range_start
+                if date_range_end is not None:
+                    digest.date_range_end = date_range_end
+                if focus_category is not None:
+                    digest.focus_category = focus_category
+                if channels_json is not None:
+                    digest.channels_filter = channels_json
+                if keywords_json is not None:
+                    digest.keywords_filter = keywords_json
                 
-                if digest:
-                    # Обновляем поля дайджеста
-                    digest.text = text
-                    digest.date = date
-                    digest.last_updated = last_updated
-                    
-                    # Обновляем дополнительные параметры, если они предоставлены
-                    if date_range_start is not None:
-                        digest.date_range_start = date_range_start
-                    if date_range_end is not None:
-                        digest.date_range_end = date_range_end
-                    if focus_category is not None:
-                        digest.focus_category = focus_category
-                    if channels_json is not None:
-                        digest.channels_filter = channels_json
-                    if keywords_json is not None:
-                        digest.keywords_filter = keywords_json
-                    
-                    # Добавляем признак дайджеста за текущий день
-                    if hasattr(digest, 'is_today'):
-                        digest.is_today = is_today
-                    
-                    # Удаляем существующие секции
+                # Добавляем признак дайджеста за текущий день
+                if hasattr(digest, 'is_today'):
+                    digest.is_today = is_today
+                
+                # Удаляем существующие секции
+                if not sections_unchanged:
                     session.query(DigestSection).filter_by(digest_id=digest_id).delete()
-                else:
-                    # Если дайджест не найден, создаем новый
-                    digest = Digest(
-                        date=date, 
-                        text=text, 
-                        digest_type=digest_type,
-                        date_range_start=date_range_start,
-                        date_range_end=date_range_end,
-                        focus_category=focus_category,
-                        channels_filter=channels_json,
-                        keywords_filter=keywords_json,
-                        last_updated=last_updated,
-                        is_today=is_today
-                    )
-                    session.add(digest)
             else:
-                # Создаем новый дайджест
+                # Если дайджест не найден, создаем новый
                 digest = Digest(
                     date=date, 
                     text=text, 
@@ -827,58 +821,140 @@ class DatabaseManager:
                     is_today=is_today
                 )
                 session.add(digest)
-            
-            # Применяем изменения и получаем ID
-            session.flush()
-            
-            # Добавляем секции (с обработкой блокировок)
-            sections_data = []
-            for category, section_text in sections.items():
-                try:
+        else:
+            # Создаем новый дайджест
+            digest = Digest(
+                date=date, 
+                text=text, 
+                digest_type=digest_type,
+                date_range_start=date_range_start,
+                date_range_end=date_range_end,
+                focus_category=focus_category,
+                channels_filter=channels_json,
+                keywords_filter=keywords_json,
+                last_updated=last_updated,
+                is_today=is_today
+            )
+            session.add(digest)
+        
+        # Применяем изменения и получаем ID
+        session.flush()
+        
+        # Добавляем секции (с обработкой блокировок)
+        sections_data = []
+        for category, section_text in sections.items():
+            try:
+                if not sections_unchanged:
                     section = DigestSection(
                         digest_id=digest.id,
                         category=category,
                         text=section_text
                     )
                     session.add(section)
-                    sections_data.append({
-                        "category": category,
-                        "text": section_text
-                    })
-                except Exception as e:
-                    logger.error(f"Ошибка при добавлении секции '{category}': {str(e)}")
+                sections_data.append({
+                    "category": category,
+                    "text": section_text
+                })
+            except Exception as e:
+                logger.error(f"Ошибка при добавлении секции '{category}': {str(e)}")
+        
+        return {
+            "digest": digest,
+            "date": date,
+            "digest_type": digest_type,
+            "sections": sections_data,
+            "is_today": is_today,
+            "last_updated": last_updated,
+            "updated": digest_id is not None
+        }
+
+    def _commit_with_retries(self, session):
+        """
+        Фиксация изменений с повторными попытками при ошибках
+        """
+        retry_commit = 0
+        while retry_commit < 3:
+            try:
+                session.commit()
+                break
+            except Exception as e:
+                retry_commit += 1
+                if retry_commit >= 3:
+                    raise
+                logger.warning(f"Ошибка при фиксации изменений: {str(e)}, повторная попытка {retry_commit}/3")
+                time.sleep(retry_commit)
+
+    @staticmethod
+    def _staged_digest_result(staged):
+        """
+        Результат сохранения дайджеста после фиксации транзакции
+        """
+        result = {
+            "id": staged["digest"].id,
+            "date": staged["date"],
+            "digest_type": staged["digest_type"],
+            "sections": staged["sections"],
+            "is_today": staged["is_today"],
+            "last_updated": staged["last_updated"]
+        }
+        logger.info(f"Сохранен дайджест типа '{staged['digest_type']}' за {staged['date'].strftime('%Y-%m-%d')}, обновлен: {staged['updated']}")
+        return result
+
+    @with_retry(max_attempts=5, delay=1.0)
+    def save_digest_with_parameters(self, date, text, sections, digest_type="brief", 
+                            date_range_start=None, date_range_end=None, 
+                            focus_category=None, channels_filter=None, 
+                            keywords_filter=None, digest_id=None,
+                            is_today=False, last_updated=None):
+        """
+        Сохранение дайджеста с расширенными параметрами и улучшенной обработкой ошибок
+        """
+        session = self.Session()
+        try:
+            staged = self._stage_digest(
+                session, date, text, sections, digest_type=digest_type,
+                date_range_start=date_range_start, date_range_end=date_range_end,
+                focus_category=focus_category, channels_filter=channels_filter,
+                keywords_filter=keywords_filter, digest_id=digest_id,
+                is_today=is_today, last_updated=last_updated
+            )
             
             # Фиксируем изменения с повторными попытками при ошибках
-            retry_commit = 0
-            while retry_commit < 3:
-                try:
-                    session.commit()
-                    break
-                except Exception as e:
-                    retry_commit += 1
-                    if retry_commit >= 3:
-                        raise
-                    logger.warning(f"Ошибка при фиксации изменений: {str(e)}, повторная попытка {retry_commit}/3")
-                    time.sleep(retry_commit)
-            
-            # Создаем результат для возврата
-            result = {
-                "id": digest.id,
-                "date": date,
-                "digest_type": digest_type,
-                "sections": sections_data,
-                "is_today": is_today,
-                "last_updated": last_updated
-            }
+            self._commit_with_retries(session)
             
-            logger.info(f"Сохранен дайджест типа '{digest_type}' за {date.strftime('%Y-%m-%d')}, обновлен: {digest_id is not None}")
-            return result
+            return self._staged_digest_result(staged)
         except Exception as e:
             session.rollback()
             logger.error(f"Ошибка при сохранении дайджеста: {str(e)}")
             raise
         finally:
             session.close()
+
+    @with_retry(max_attempts=5, delay=1.0)
+    def save_digests_with_parameters(self, digests):
+        """
+        Сохранение нескольких дайджестов (например, краткого и подробного)
+        одной транзакцией: одна фиксация вместо отдельной на каждый дайджест
+        
+        Args:
+            digests (list): Список словарей с аргументами save_digest_with_parameters
+            
+        Returns:
+            list: Результаты сохранения в том же порядке
+        """
+        session = self.Session()
+        try:
+            staged_digests = [self._stage_digest(session, **params) for params in digests]
+            
+            self._commit_with_retries(session)
+            
+            return [self._staged_digest_result(staged) for staged in staged_digests]
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Ошибка при сохранении дайджестов: {str(e)}")
+            raise
+        finally:
+            session.close()
               
     def find_digests_by_parameters(self, digest_type=None, date=None, 
                            date_range_start=None, date_range_end=None,
@@ -1085,8 +1161,6 @@ class DatabaseManager:
         """
         Получение сообщений с расширенной фильтрацией и пагинацией
         """
-        from sqlalchemy import or_
-        
         session = self.Session()
         try:
             logger.info(f"Запрос сообщений с {start_date.strftime('%Y-%m-%d')} по {end_date.strftime('%Y-%m-%d')}")
@@ -1105,22 +1179,18 @@ class DatabaseManager:
                 # Если это date, преобразуем в datetime с временем 23:59:59
                 end_date = datetime.combine(end_date, datetime.max.time())
             
+            # Все фильтры собираются в один запрос; промежуточные COUNT по каждому
+            # фильтру не выполняем - они нужны были только для логов
             query = session.query(Message).filter(
                 Message.date >= start_date,
                 Message.date <= end_date
             )
             
-            # Логируем количество сообщений после фильтрации по дате
-            date_count = query.count()
-            logger.info(f"Найдено {date_count} сообщений в указанном диапазоне дат")
-            
             if category:
                 query = query.filter(Message.category == category)
-                logger.info(f"После фильтрации по категории '{category}': {query.count()} сообщений")
             
             if channels:
                 query = query.filter(Message.channel.in_(channels))
-                logger.info(f"После фильтрации по каналам: {query.count()} сообщений")
             
             if keywords:
                 # Создаем условия поиска для каждого ключевого слова
@@ -1130,7 +1200,6 @@ class DatabaseManager:
                 
                 # Объединяем условия через OR
                 query = query.filter(or_(*keyword_conditions))
-                logger.info(f"После фильтрации по ключевым словам: {query.count()} сообщений")
         
             # Получаем общее количество записей для пагинации
             total = query.count()
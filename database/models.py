@@ -25,6 +25,7 @@ class Message(Base):
     # Уникальный индекс чтобы избежать дублирования сообщений
     __table_args__ = (
         UniqueConstraint('channel', 'message_id', name='uix_message_channel_id'),
+        Index('idx_message_date', date),  # Выборка за период с сортировкой по дате
     )
     
     def __repr__(self):
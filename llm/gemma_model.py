@@ -5,10 +5,21 @@ import logging
 import requests
 import hashlib
 import os
+import threading
 import time
+from config.settings import LLM_MAX_CONCURRENT_REQUESTS
 
 logger = logging.getLogger(__name__)
 
+# Все экземпляры обращаются к одному локальному серверу LM Studio, поэтому
+# число одновременных запросов ограничено общим для процесса лимитом: лишние
+# ждут свободного слота, а не упираются в таймаут на перегруженном сервере
+_REQUEST_SLOTS = threading.BoundedSemaphore(LLM_MAX_CONCURRENT_REQUESTS)
+
+# Ответ-заглушка при исчерпании попыток после таймаутов. В кэш не попадает,
+# иначе временная перегрузка сервера закрепилась бы за промптом на сутки
+TIMEOUT_RESPONSE = "Не удалось получить ответ от LLM из-за превышения времени ожидания. Попробуйте упростить запрос."
+
 class GemmaLLM:
     """Класс для работы с моделью Gemma 3"""
     
@@ -53,6 +64,8 @@ class GemmaLLM:
             
             # Если нет кэша, генерируем ответ
             response = self._generate_response(prompt, max_tokens, temperature)
+            if response == TIMEOUT_RESPONSE:
+                return response
             
             # Сохраняем в кэш
             with open(cache_file, 'w', encoding='utf-8') as f:
@@ -106,10 +119,13 @@ class GemmaLLM:
         prompt_length = len(prompt)
         logger.debug(f"Отправка запроса к LLM ({prompt_length} символов, {max_tokens} токенов)")
         
-        start_time = time.time()
         try:
-            # Добавляем таймаут
-            response = requests.post(self.api_url, json=payload, timeout=30)
+            # Слот занят только на время HTTP-запроса: повторные попытки
+            # ниже выполняются уже после его освобождения
+            with _REQUEST_SLOTS:
+                start_time = time.time()
+                # Добавляем таймаут
+                response = requests.post(self.api_url, json=payload, timeout=30)
             response.raise_for_status()
             
             elapsed = time.time() - start_time
@@ -146,7 +162,7 @@ class GemmaLLM:
                 return f"Категория: {category_fallback or 'другое'}\nУверенность: 1"
             else:
                 # Обычный запрос
-                return "Не удалось получить ответ от LLM из-за превышения времени ожидания. Попробуйте упростить запрос."
+                return TIMEOUT_RESPONSE
         
         except requests.exceptions.RequestException as e:
             elapsed = time.time() - start_time